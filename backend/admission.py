@@ -0,0 +1,132 @@
+import os
+import math
+import time
+import heapq
+import asyncio
+import itertools
+from typing import Dict, List, Optional
+
+# Runs share the one project (code dir, concept.pdf, history), so only raise
+# this once runs get their own workspace
+MAX_FLOW_RUNS = int(os.getenv("MAX_FLOW_RUNS", "1"))
+MAX_QUEUED_RUNS = int(os.getenv("MAX_QUEUED_RUNS", "16"))
+# Queued runs of one client, so a single client cannot fill the whole queue
+MAX_QUEUED_PER_CLIENT = int(os.getenv("MAX_QUEUED_PER_CLIENT", "4"))
+# Clients pick a priority from 0 to MAX_PRIORITY, so a client cannot jump
+# arbitrarily far past the round-robin between clients
+MAX_PRIORITY = 2
+# Expected length of a flow run until the first runs have finished
+FLOW_RUN_ESTIMATE_SECONDS = float(os.getenv("FLOW_RUN_ESTIMATE_SECONDS", "300"))
+
+class QueueFull(Exception):
+    def __init__(self, retry_after: int, message: str = "Run queue is full"):
+        super().__init__(f"{message}, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+class Ticket:
+    def __init__(self, client: str, priority: int, seq: int, round: int):
+        self.client = client
+        self.priority = priority
+        self.seq = seq
+        # Round-robin turn: one past the client's previous run, and not
+        # before the turn being served when it was queued
+        self.round = round
+        self.admitted = asyncio.Event()
+        self.started_at: Optional[float] = None
+
+    def sort_key(self):
+        return (-self.priority, self.round, self.seq)
+
+    def __lt__(self, other: "Ticket"):
+        return self.sort_key() < other.sort_key()
+
+class AdmissionController:
+    """
+    Limits how many flow runs are in flight. Runs that do not fit wait in a
+    bounded queue ordered by priority (higher first), then round-robin between
+    clients, then arrival. Each client can only hold `max_queued_per_client`
+    of the queued runs.
+    """
+
+    def __init__(self, max_in_flight: int = MAX_FLOW_RUNS, max_queued: int = MAX_QUEUED_RUNS,
+                 estimate: float = FLOW_RUN_ESTIMATE_SECONDS, max_queued_per_client: int = MAX_QUEUED_PER_CLIENT):
+        self.max_in_flight = max_in_flight
+        self.max_queued = max_queued
+        self.max_queued_per_client = max_queued_per_client
+        self.average_duration = estimate
+        self.running: List[Ticket] = []
+        self.queue: List[Ticket] = []
+        self._seq = itertools.count()
+        # Round of the latest admitted run; clients that show up later start here
+        self.current_round = 0
+
+    def submit(self, client: str, priority: int = 0) -> Ticket:
+        """
+        Admits a run right away if a slot is free, queues it otherwise, and
+        raises QueueFull when the queue, or the client's share of it, is at its limit.
+        """
+        if len(self.running) >= self.max_in_flight:
+            if sum(1 for ticket in self.queue if ticket.client == client) >= self.max_queued_per_client:
+                raise QueueFull(self.retry_after(), "Too many queued runs for this client")
+            if len(self.queue) >= self.max_queued:
+                raise QueueFull(self.retry_after())
+
+        rounds = [ticket.round for ticket in self.running + self.queue if ticket.client == client]
+        round = max(self.current_round, max(rounds) + 1) if rounds else self.current_round
+        ticket = Ticket(client, priority, next(self._seq), round)
+        heapq.heappush(self.queue, ticket)
+        self._dispatch()
+        return ticket
+
+    async def wait(self, ticket: Ticket):
+        await ticket.admitted.wait()
+
+    def release(self, ticket: Ticket):
+        """
+        Frees the slot of a finished run, or drops a run that is still queued.
+        """
+        if ticket in self.queue:
+            self.queue.remove(ticket)
+            heapq.heapify(self.queue)
+        elif ticket in self.running:
+            self.running.remove(ticket)
+            duration = time.monotonic() - ticket.started_at
+            self.average_duration = 0.8 * self.average_duration + 0.2 * duration
+        self._dispatch()
+
+    def _dispatch(self):
+        while self.queue and len(self.running) < self.max_in_flight:
+            ticket = heapq.heappop(self.queue)
+            ticket.started_at = time.monotonic()
+            self.current_round = max(self.current_round, ticket.round)
+            self.running.append(ticket)
+            ticket.admitted.set()
+
+    def position(self, ticket: Ticket) -> int:
+        """
+        1-based place in the queue, 0 once the run has been admitted.
+        """
+        if ticket.admitted.is_set():
+            return 0
+        return sorted(self.queue).index(ticket) + 1
+
+    def estimated_wait(self, ticket: Ticket) -> int:
+        """
+        Rough seconds until the run starts, assuming runs of average length.
+        """
+        position = self.position(ticket)
+        if position == 0:
+            return 0
+        return math.ceil(math.ceil(position / self.max_in_flight) * self.average_duration)
+
+    def retry_after(self) -> int:
+        return math.ceil(self.average_duration / self.max_in_flight)
+
+    def client_status(self, client: str) -> Dict[str, int]:
+        """
+        Queue position and estimated wait of the client's next queued run.
+        """
+        queued = [ticket for ticket in sorted(self.queue) if ticket.client == client]
+        if not queued:
+            return {"queue_position": 0, "estimated_wait": 0}
+        return {"queue_position": self.position(queued[0]), "estimated_wait": self.estimated_wait(queued[0])}
@@ -0,0 +1,212 @@
+"""
+End-to-end benchmark of the backend against a local Langflow stand-in.
+
+Every simulated project gets its own backend process (the backend keeps a
+single project per process) and walks the real pipeline:
+
+    /start -> Langflow run -> /update-status ... -> /iteration-done -> /zip-download
+
+The fake Langflow server replays the runs in `recordings/`. Run from the
+backend directory:
+
+    python -m benchmarks.e2e --projects 8 --time-scale 0.05
+    python -m benchmarks.e2e --save-baseline benchmarks/e2e_baseline.json
+    python -m benchmarks.e2e --baseline benchmarks/e2e_baseline.json
+"""
+import argparse
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+import requests
+
+from benchmarks.fake_langflow import FakeLangflow, ServerThread, load_recordings, RECORDINGS_DIR
+from benchmarks.report import summarize, compare, print_table, load_results, save_results
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_PDF = os.path.join(BACKEND_DIR, "tests", "test.pdf")
+COLUMNS = ["count", "throughput_rps", "mean_ms", "p50_ms", "p95_ms", "p99_ms"]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class BackendProcess:
+    """
+    A backend started with uvicorn in its own working directory, so its
+    `../data/project` does not collide with the other projects.
+    """
+
+    def __init__(self, root: str, flow_id: str, langflow_url: str):
+        self.cwd = os.path.join(root, "backend")
+        self.project_dir = os.path.join(root, "data", "project")
+        self.code_dir = os.path.join(self.project_dir, "code")
+        self.flow_id = flow_id
+        self.port = free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        os.makedirs(self.cwd)
+        env = dict(
+            os.environ,
+            LANGFLOW_API_URL=langflow_url,
+            FLOW_ID=flow_id,
+            TEXT_INPUT_FIELD_NAME="TextInput-mnXNV",
+            FILE_INPUT_FIELD_NAME="file",
+            GIT_AUTHOR_NAME="bench", GIT_AUTHOR_EMAIL="bench@localhost",
+            GIT_COMMITTER_NAME="bench", GIT_COMMITTER_EMAIL="bench@localhost",
+            GIT_CONFIG_COUNT="1", GIT_CONFIG_KEY_0="init.defaultBranch", GIT_CONFIG_VALUE_0="main",
+        )
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", BACKEND_DIR,
+             "--host", "127.0.0.1", "--port", str(self.port), "--log-level", "warning"],
+            cwd=self.cwd, env=env, stdout=subprocess.DEVNULL,
+        )
+
+    def wait_ready(self, timeout: float = 30):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            try:
+                requests.get(f"{self.url}/status", timeout=1)
+                return
+            except requests.exceptions.ConnectionError:
+                time.sleep(0.05)
+        raise RuntimeError(f"Backend on port {self.port} did not start")
+
+    def stop(self):
+        self.process.terminate()
+        self.process.wait()
+
+
+def is_finished(response: requests.Response, iterations: int) -> bool:
+    # /status only returns the latest iterations; the ones before the page are finished
+    page = [item for item in response.json() if isinstance(item, list)]
+    unfinished = [item for item in page if not any(status["stage"] == "Finished" for status in item)]
+    return int(response.headers["X-Total-Iterations"]) - len(unfinished) >= iterations
+
+
+def run_project(backend: BackendProcess, pdf_path: str, iterations: int, poll_interval: float,
+                timeout: float, samples: Dict[str, List[float]], lock: threading.Lock):
+    def timed(method: str, endpoint: str, **kwargs) -> requests.Response:
+        started = time.perf_counter()
+        response = requests.request(method, f"{backend.url}{endpoint}", **kwargs)
+        elapsed = time.perf_counter() - started
+        response.raise_for_status()
+        with lock:
+            samples[endpoint].append(elapsed)
+        return response
+
+    for iteration in range(1, iterations + 1):
+        started = time.perf_counter()
+        with open(pdf_path, 'rb') as f:
+            timed("POST", "/start", files={"file": ("concept.pdf", f, "application/pdf")})
+
+        deadline = time.time() + timeout
+        while not is_finished(timed("GET", "/status"), iteration):
+            if time.time() > deadline:
+                raise TimeoutError(f"{backend.flow_id} did not finish iteration {iteration}")
+            time.sleep(poll_interval)
+
+        timed("GET", "/zip-download")
+        with lock:
+            samples["pipeline"].append(time.perf_counter() - started)
+
+
+def run_benchmark(args) -> Dict:
+    fake = FakeLangflow(load_recordings(args.recordings), time_scale=args.time_scale, seed=args.seed)
+    langflow_port = free_port()
+    langflow = ServerThread(fake.app, langflow_port)
+    langflow.start()
+
+    root = tempfile.mkdtemp(prefix="e2e-bench-")
+    backends = []
+    try:
+        for i in range(args.projects):
+            backend = BackendProcess(os.path.join(root, f"project-{i}"), f"bench-{i}",
+                                     f"http://127.0.0.1:{langflow_port}")
+            fake.register(backend.flow_id, backend.url, backend.code_dir)
+            backends.append(backend)
+        for backend in backends:
+            backend.wait_ready()
+
+        samples: Dict[str, List[float]] = defaultdict(list)
+        lock = threading.Lock()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.projects) as pool:
+            futures = [
+                pool.submit(run_project, backend, args.pdf, args.iterations, args.poll_interval, args.timeout, samples, lock)
+                for backend in backends
+            ]
+            for future in futures:
+                future.result()
+        wall_time = time.perf_counter() - started
+        fake.wait_for_runs(timeout=args.timeout)
+    finally:
+        for backend in backends:
+            backend.stop()
+        langflow.stop()
+        shutil.rmtree(root, ignore_errors=True)
+
+    if fake.errors:
+        raise RuntimeError("Replay failed: " + "; ".join(fake.errors))
+
+    samples.update(fake.samples)
+    return {
+        "config": {
+            "projects": args.projects,
+            "iterations": args.iterations,
+            "time_scale": args.time_scale,
+            "recordings": [recording["name"] for recording in fake.recordings],
+        },
+        "wall_time_s": wall_time,
+        "pipelines_per_s": args.projects * args.iterations / wall_time,
+        "endpoints": summarize(samples, wall_time),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--projects", type=int, default=4, help="number of concurrent projects")
+    parser.add_argument("--iterations", type=int, default=1, help="uploads per project")
+    parser.add_argument("--time-scale", type=float, default=0.1, help="multiplier for the recorded delays")
+    parser.add_argument("--poll-interval", type=float, default=0.2, help="seconds between /status polls")
+    parser.add_argument("--timeout", type=float, default=120, help="seconds to wait for one iteration")
+    parser.add_argument("--recordings", default=RECORDINGS_DIR)
+    parser.add_argument("--pdf", default=DEFAULT_PDF)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the results as JSON")
+    parser.add_argument("--baseline", help="compare against a stored result file")
+    parser.add_argument("--save-baseline", help="store the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative slowdown vs. the baseline")
+    args = parser.parse_args()
+
+    results = run_benchmark(args)
+    print(f"{args.projects} projects x {args.iterations} iterations in {results['wall_time_s']:.2f}s "
+          f"({results['pipelines_per_s']:.2f} pipelines/s)")
+    print_table(results["endpoints"], COLUMNS)
+
+    if args.output:
+        save_results(args.output, results)
+    if args.save_baseline:
+        save_results(args.save_baseline, results)
+    if args.baseline:
+        regressions = compare(results["endpoints"], load_results(args.baseline)["endpoints"],
+                              ["p50_ms", "p95_ms", "p99_ms"], args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print("No regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
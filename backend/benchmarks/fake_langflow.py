@@ -0,0 +1,189 @@
+"""
+Local stand-in for the Langflow container.
+
+It serves `/api/v1/run/{flow_id}` like Langflow does and replays a recorded
+agent run against the backend that triggered it: the agent's tool calls
+(read_file, write_file, list_directory, shell_command) are applied to the
+project's code directory, status updates are posted to `/update-status` with
+the recorded timing, and the run ends with `/iteration-done`. With
+`?stream=true` the run is streamed back as Langflow's newline-delimited
+events (token chunks, tool_use messages, end) while it is replayed.
+"""
+import json
+import os
+import random
+import subprocess
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterator, List
+
+import requests
+import uvicorn
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
+
+RECORDINGS_DIR = os.path.join(os.path.dirname(__file__), "recordings")
+
+# Mirrors the defaults of the ShellCommandTool component
+ALLOWED_COMMANDS = ["ls", "cat", "git", "python", "pytest", "ruff", "node", "npm", "rg", "pip", "echo", "mkdir"]
+
+
+def load_recordings(directory: str = RECORDINGS_DIR) -> List[Dict]:
+    recordings = []
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".json"):
+            with open(os.path.join(directory, name), 'r') as f:
+                recordings.append(json.load(f))
+    return recordings
+
+
+class Workspace:
+    """
+    The same tool semantics as `components/initialized_tools.py`, rooted at
+    a project's code directory instead of `/app/workspace`.
+    """
+
+    def __init__(self, root: str):
+        self.root = Path(root).resolve()
+
+    def _resolve(self, path: str) -> Path:
+        full_path = (self.root / path).resolve()
+        if not full_path.is_relative_to(self.root):
+            raise ValueError(f"Path outside workspace: {path}")
+        return full_path
+
+    def read_file(self, path: str) -> str:
+        return self._resolve(path).read_text(encoding="utf-8")
+
+    def write_file(self, path: str, content: str) -> str:
+        full_path = self._resolve(path)
+        full_path.parent.mkdir(parents=True, exist_ok=True)
+        full_path.write_text(content, encoding="utf-8")
+        return f"Successfully wrote {len(content)} characters to {path}"
+
+    def list_directory(self, path: str = ".") -> str:
+        return "\n".join(str(item.relative_to(self.root)) for item in sorted(self._resolve(path).iterdir()))
+
+    def shell_command(self, command: str) -> str:
+        cmd_parts = command.strip().split()
+        if not cmd_parts or cmd_parts[0] not in ALLOWED_COMMANDS:
+            return f"Error: Command not allowed: {command}"
+        result = subprocess.run(command, shell=True, cwd=str(self.root), capture_output=True, text=True, timeout=25)
+        return result.stdout + result.stderr
+
+
+class FakeLangflow:
+    """
+    Replays recorded runs. Every flow id has to be registered with the
+    backend it belongs to and that backend's code directory, since the real
+    flow finds both through its own configuration.
+    """
+
+    def __init__(self, recordings: List[Dict], time_scale: float = 1.0, seed: int = 0):
+        self.recordings = recordings
+        self.time_scale = time_scale
+        self.projects: Dict[str, Dict] = {}
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.errors: List[str] = []
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+        self._runs: List[threading.Thread] = []
+        self.app = self._create_app()
+
+    def register(self, flow_id: str, backend_url: str, code_dir: str):
+        self.projects[flow_id] = {"backend_url": backend_url, "code_dir": code_dir}
+
+    def _create_app(self) -> FastAPI:
+        app = FastAPI()
+
+        @app.post("/api/v1/run/{flow_id}")
+        async def run_flow(flow_id: str, request: Request):
+            if flow_id not in self.projects:
+                raise HTTPException(status_code=404, detail=f"Flow {flow_id} not found")
+            # Drain the upload the same way Langflow does before starting the run
+            await request.body()
+            with self._lock:
+                recording = self._random.choice(self.recordings)
+            if request.query_params.get("stream") == "true":
+                events = (json.dumps(event) + "\n\n" for event in self.replay_events(flow_id, recording))
+                return StreamingResponse(events, media_type="application/x-ndjson")
+            run = threading.Thread(target=self.replay, args=(flow_id, recording), daemon=True)
+            run.start()
+            self._runs.append(run)
+            return recording.get("response", {"outputs": []})
+
+        return app
+
+    def _record(self, endpoint: str, elapsed: float):
+        with self._lock:
+            self.samples[endpoint].append(elapsed)
+
+    def _post(self, backend_url: str, endpoint: str, **kwargs):
+        started = time.perf_counter()
+        response = requests.post(f"{backend_url}{endpoint}", **kwargs)
+        self._record(endpoint, time.perf_counter() - started)
+        response.raise_for_status()
+
+    def replay_events(self, flow_id: str, recording: Dict) -> Iterator[Dict]:
+        """
+        Replays a recording and yields the events Langflow would stream for it.
+        """
+        project = self.projects[flow_id]
+        workspace = Workspace(project["code_dir"])
+        message_id = f"{flow_id}-{recording['name']}"
+        tool_uses = []
+        try:
+            for event in recording["events"]:
+                time.sleep(event.get("delay", 0) * self.time_scale)
+                if event["type"] == "tool":
+                    tool_use = {"type": "tool_use", "name": event["tool"], "tool_input": event.get("args", {}), "output": None}
+                    tool_uses.append(tool_use)
+                    yield {"event": "add_message", "data": {"id": message_id, "content_blocks": [{"title": "Agent Steps", "contents": tool_uses}]}}
+                    started = time.perf_counter()
+                    tool_use["output"] = getattr(workspace, event["tool"])(**event.get("args", {}))
+                    self._record(f"tool:{event['tool']}", time.perf_counter() - started)
+                    yield {"event": "add_message", "data": {"id": message_id, "content_blocks": [{"title": "Agent Steps", "contents": tool_uses}]}}
+                elif event["type"] == "status":
+                    self._post(project["backend_url"], "/update-status",
+                               json={"stage": event["stage"], "message": event["message"]})
+                    for word in event["message"].split():
+                        yield {"event": "token", "data": {"id": message_id, "chunk": word + " "}}
+                elif event["type"] == "iteration_done":
+                    self._post(project["backend_url"], "/iteration-done")
+            yield {"event": "end", "data": {"result": recording.get("response", {"outputs": []})}}
+        except Exception as e:
+            with self._lock:
+                self.errors.append(f"{flow_id}: {e}")
+            yield {"event": "error", "data": {"error": str(e)}}
+
+    def replay(self, flow_id: str, recording: Dict):
+        for _ in self.replay_events(flow_id, recording):
+            pass
+
+    def wait_for_runs(self, timeout: float = None):
+        for run in list(self._runs):
+            run.join(timeout)
+
+
+class ServerThread(threading.Thread):
+    """
+    Runs a uvicorn server in the background of the current process.
+    """
+
+    def __init__(self, app: FastAPI, port: int):
+        super().__init__(daemon=True)
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+
+    def run(self):
+        self.server.run()
+
+    def start(self):
+        super().start()
+        while not self.server.started:
+            time.sleep(0.01)
+
+    def stop(self):
+        self.server.should_exit = True
+        self.join()
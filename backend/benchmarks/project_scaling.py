@@ -0,0 +1,214 @@
+"""
+Micro-benchmarks for the hot paths of `project.py` on synthetic projects.
+
+History benchmarks build a `history.json` with the given number of statuses
+(spread over iterations of `--statuses-per-iteration` each) and measure
+`Project._load_history`, `Project.add_status` and `Project.save_history`.
+Code tree benchmarks fill the code directory with the given number of files
+and measure `Iteration.commit`, `Project.rollback` and the archive built by
+`/zip-download`.
+
+Time is the median over `--repeat` untraced runs, peak memory is what
+tracemalloc sees on the Python side in one extra run (git runs in a
+subprocess and is not included).
+Run from the backend directory:
+
+    python -m benchmarks.project_scaling
+    python -m benchmarks.project_scaling --statuses 1000,10000,100000 --files 1000,10000
+    python -m benchmarks.project_scaling --baseline benchmarks/project_baseline.json
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Callable, Dict, List
+
+import project as project_module
+from project import Project, Iteration
+from benchmarks.report import compare, print_table, load_results, save_results
+
+COLUMNS = ["time_ms", "peak_kib"]
+
+
+def measure(func: Callable, setup: Callable = None, repeat: int = 3) -> Dict:
+    """
+    Runs `setup` (untimed) and `func` `repeat` times and returns the median
+    time, then runs them once more under tracemalloc for the Python heap peak
+    of `func`. Tracing slows allocations down a lot, so it stays out of the
+    timed runs.
+    """
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - started)
+
+    if setup:
+        setup()
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {"time_ms": 1000 * statistics.median(times), "peak_kib": peak / 1024}
+
+
+def new_project(root: str) -> Project:
+    project_module.DATA_DIR = os.path.join(root, "data", "project")
+    return Project()
+
+
+def write_history(project: Project, statuses: int, statuses_per_iteration: int):
+    project.history = []
+    for i in range(max(1, statuses // statuses_per_iteration)):
+        project.history.append(f"Prompt {i}")
+        iteration = Iteration(commit_id=f"{i:040x}", project_dir=project.project_dir)
+        iteration.status_list = [
+            {
+                "stage": "Implementation",
+                "message": f"Wrote module_{j}.py with the handlers for step {j} of iteration {i}",
+                "zip_result": None,
+                "preview": None,
+                "index": j,
+            }
+            for j in range(statuses_per_iteration)
+        ]
+        project.history.append(iteration)
+    project.save_history()
+
+
+def write_code_tree(code_dir: str, files: int, files_per_dir: int = 100):
+    for i in range(files):
+        directory = os.path.join(code_dir, f"pkg_{i // files_per_dir}")
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f"module_{i}.py"), 'w') as f:
+            f.write(f"def handler_{i}(request):\n    return {{'id': {i}}}\n")
+
+
+def touch_files(code_dir: str, files: int, label: str, every: int = 10):
+    """
+    Modifies every `every`-th file so each commit has a realistic diff.
+    """
+    for i in range(0, files, every):
+        with open(os.path.join(code_dir, f"pkg_{i // 100}", f"module_{i}.py"), 'a') as f:
+            f.write(f"# {label}\n")
+
+
+def bench_history(root: str, statuses: int, statuses_per_iteration: int, repeat: int) -> Dict[str, Dict]:
+    project = new_project(root)
+    write_history(project, statuses, statuses_per_iteration)
+    return {
+        f"_load_history[{statuses}]": measure(project._load_history, repeat=repeat),
+        f"save_history[{statuses}]": measure(project.save_history, repeat=repeat),
+        f"add_status[{statuses}]": measure(lambda: project.add_status("Testing", "Ran the test suite"), repeat=repeat),
+    }
+
+
+def bench_code_tree(root: str, files: int, repeat: int) -> Dict[str, Dict]:
+    project = new_project(root)
+    write_code_tree(project.code_dir, files)
+    project.add_status("Implementation", "Initial code")
+    project.history[-1].commit()
+    archive_base = os.path.join(root, "code")
+    counter = iter(range(sys.maxsize))
+
+    def new_iteration():
+        touch_files(project.code_dir, files, f"change {next(counter)}")
+        project.add_prompt("Change request")
+        project.add_status("Implementation", "Changed code")
+
+    def commit_and_keep():
+        new_iteration()
+        project.history[-1].commit()
+
+    return {
+        f"Iteration.commit[{files}]": measure(lambda: project.history[-1].commit(), setup=new_iteration, repeat=repeat),
+        f"rollback[{files}]": measure(project.rollback, setup=commit_and_keep, repeat=repeat),
+        f"zip_download[{files}]": measure(lambda: shutil.make_archive(archive_base, 'zip', project.code_dir), repeat=repeat),
+    }
+
+
+@contextmanager
+def quiet_subprocesses():
+    """
+    Project runs git without capturing its output; keep the file listings of
+    large commits out of the report.
+    """
+    sys.stdout.flush()
+    saved = os.dup(1)
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    try:
+        yield
+    finally:
+        os.dup2(saved, 1)
+        os.close(devnull)
+        os.close(saved)
+
+
+def run_benchmark(args) -> Dict[str, Dict]:
+    results = {}
+    for statuses in args.statuses:
+        root = tempfile.mkdtemp(prefix="project-bench-")
+        try:
+            results.update(bench_history(root, statuses, args.statuses_per_iteration, args.repeat))
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+    for files in args.files:
+        root = tempfile.mkdtemp(prefix="project-bench-")
+        try:
+            results.update(bench_code_tree(root, files, args.repeat))
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+    return dict(sorted(results.items(), key=lambda item: (item[0].split("[")[0], int(item[0].split("[")[1][:-1]))))
+
+
+def sizes(value: str) -> List[int]:
+    return [int(size) for size in value.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--statuses", type=sizes, default=[1000, 10000, 50000], help="total statuses in the history")
+    parser.add_argument("--statuses-per-iteration", type=int, default=50)
+    parser.add_argument("--files", type=sizes, default=[100, 1000, 10000], help="files in the code tree")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="write the results as JSON")
+    parser.add_argument("--baseline", help="compare against a stored result file")
+    parser.add_argument("--save-baseline", help="store the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown vs. the baseline")
+    args = parser.parse_args()
+
+    os.environ.setdefault("GIT_AUTHOR_NAME", "bench")
+    os.environ.setdefault("GIT_AUTHOR_EMAIL", "bench@localhost")
+    os.environ.setdefault("GIT_COMMITTER_NAME", "bench")
+    os.environ.setdefault("GIT_COMMITTER_EMAIL", "bench@localhost")
+    os.environ.update(GIT_CONFIG_COUNT="1", GIT_CONFIG_KEY_0="init.defaultBranch", GIT_CONFIG_VALUE_0="main")
+
+    with quiet_subprocesses():
+        results = run_benchmark(args)
+    print_table(results, COLUMNS)
+
+    if args.output:
+        save_results(args.output, results)
+    if args.save_baseline:
+        save_results(args.save_baseline, results)
+    if args.baseline:
+        regressions = compare(results, load_results(args.baseline), COLUMNS, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print("No regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import json
+import math
+from typing import Dict, List
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """
+    Nearest-rank percentile of a list of samples.
+    """
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(samples: Dict[str, List[float]], wall_time: float) -> Dict[str, Dict]:
+    """
+    Turns raw latency samples (seconds) per endpoint into throughput and
+    p50/p95/p99 latency in milliseconds.
+    """
+    summary = {}
+    for endpoint, values in sorted(samples.items()):
+        summary[endpoint] = {
+            "count": len(values),
+            "throughput_rps": len(values) / wall_time if wall_time else 0.0,
+            "mean_ms": 1000 * sum(values) / len(values) if values else 0.0,
+        }
+        for pct in PERCENTILES:
+            summary[endpoint][f"p{pct}_ms"] = 1000 * percentile(values, pct)
+    return summary
+
+
+def compare(current: Dict[str, Dict], baseline: Dict[str, Dict], metrics: List[str], tolerance: float) -> List[str]:
+    """
+    Compares two result tables and returns a line for every metric that is
+    more than `tolerance` (relative) worse than the baseline.
+    """
+    regressions = []
+    for name, row in current.items():
+        base_row = baseline.get(name)
+        if not base_row:
+            continue
+        for metric in metrics:
+            old, new = base_row.get(metric), row.get(metric)
+            if not old or new is None:
+                continue
+            if new > old * (1 + tolerance):
+                regressions.append(f"{name} {metric}: {old:.2f} -> {new:.2f} (+{100 * (new / old - 1):.0f}%)")
+    return regressions
+
+
+def print_table(rows: Dict[str, Dict], columns: List[str]):
+    name_width = max([len(name) for name in rows] + [8])
+    print(f"{'name':<{name_width}}  " + "  ".join(f"{column:>14}" for column in columns))
+    for name, row in rows.items():
+        cells = []
+        for column in columns:
+            value = row.get(column, "")
+            cells.append(f"{value:>14.2f}" if isinstance(value, float) else f"{value!s:>14}")
+        print(f"{name:<{name_width}}  " + "  ".join(cells))
+
+
+def load_results(path: str) -> Dict:
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def save_results(path: str, results: Dict):
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=4)
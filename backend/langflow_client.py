@@ -1,7 +1,10 @@
-
 import requests
 import os
+import json
+import shutil
+import tempfile
 from dotenv import load_dotenv
+from pdf_text import extract_text, file_digest
 
 load_dotenv()
 
@@ -10,7 +13,94 @@ FLOW_ID = os.getenv("FLOW_ID")
 TEXT_INPUT_FIELD_NAME = os.getenv("TEXT_INPUT_FIELD_NAME")
 FILE_INPUT_FIELD_NAME = os.getenv("FILE_INPUT_FIELD_NAME")
 
-def trigger_langflow_with_file(file_path: str, text_data: str):
+# Shared volume handoff: the uploads directory as seen by the backend (inside the
+# data directory, which docker-compose.yaml mounts at /app/data), the same
+# directory as mounted in the Langflow container, and the ids of the File node to
+# point at it and of the text input node (tweaks address nodes, not form fields).
+# Without SHARED_UPLOADS_DIR, FILE_NODE_ID and TEXT_NODE_ID the PDF is uploaded as multipart.
+SHARED_UPLOADS_DIR = os.getenv("SHARED_UPLOADS_DIR")
+LANGFLOW_UPLOADS_DIR = os.getenv("LANGFLOW_UPLOADS_DIR", "/app/data/uploads")
+FILE_NODE_ID = os.getenv("FILE_NODE_ID")
+TEXT_NODE_ID = os.getenv("TEXT_NODE_ID")
+
+# Text input that receives the PDF text extracted by the backend: its form field
+# name for multipart uploads, its node id for the shared volume handoff. When set,
+# the PDF itself is only sent if the extraction fails.
+DOCUMENT_TEXT_FIELD_NAME = os.getenv("DOCUMENT_TEXT_FIELD_NAME")
+DOCUMENT_TEXT_NODE_ID = os.getenv("DOCUMENT_TEXT_NODE_ID")
+
+def store_shared_upload(file_path: str) -> str:
+    """
+    Places a file in the shared uploads volume under its content hash, so the
+    same document is stored once, and returns its path inside the Langflow container.
+    """
+    name = file_digest(file_path) + os.path.splitext(file_path)[1]
+    shared_path = os.path.join(SHARED_UPLOADS_DIR, name)
+
+    if not os.path.exists(shared_path):
+        os.makedirs(SHARED_UPLOADS_DIR, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=SHARED_UPLOADS_DIR, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as tmp, open(file_path, 'rb') as src:
+                shutil.copyfileobj(src, tmp)
+            # mkstemp creates the file owner-only, Langflow runs as another user
+            os.chmod(tmp_path, 0o644)
+            # Another run may have stored the same content meanwhile, replacing it is harmless
+            os.replace(tmp_path, shared_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    return f"{LANGFLOW_UPLOADS_DIR.rstrip('/')}/{name}"
+
+def extract_document_text(file_path: str, target: str):
+    if not target:
+        return None
+    try:
+        return extract_text(file_path)
+    except Exception as e:
+        print(f"Could not extract text from {file_path}, sending the PDF instead: {e}")
+        return None
+
+def post_run(endpoint: str, on_event=None, **kwargs):
+    """
+    Posts a flow run. With `on_event` the run is streamed and every event is
+    passed to it as it arrives; the result is then taken from the "end" event.
+    """
+    print("Sending request to Langflow...")
+    if on_event is None:
+        response = requests.post(endpoint, **kwargs)
+        response.raise_for_status()
+        return response.json()
+
+    result = None
+    ended = False
+    with requests.post(endpoint, params={"stream": "true"}, stream=True, **kwargs) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if not line:
+                continue
+            try:
+                event = json.loads(line)
+            except ValueError:
+                print(f"Skipping malformed event from Langflow: {line[:200]!r}")
+                continue
+            on_event(event)
+            if event.get("event") == "end":
+                ended = True
+                result = (event.get("data") or {}).get("result")
+    if not ended:
+        raise requests.exceptions.ConnectionError("The run stream ended before the flow finished")
+    return result
+
+def report_error(on_event, message: str):
+    """
+    Passes a failed run on as an error event, the way Langflow reports errors inside a run.
+    """
+    if on_event is not None:
+        on_event({"event": "error", "data": {"error": message}})
+
+def trigger_langflow_with_file(file_path: str, text_data: str, on_event=None):
     """
     Triggers a Langflow flow, sending a file and additional text data.
     """
@@ -20,22 +110,45 @@ def trigger_langflow_with_file(file_path: str, text_data: str):
         print(f"Error: File not found at {file_path}")
         return None
 
+    handoff = SHARED_UPLOADS_DIR and FILE_NODE_ID and TEXT_NODE_ID
+    document_text = extract_document_text(file_path, DOCUMENT_TEXT_NODE_ID if handoff else DOCUMENT_TEXT_FIELD_NAME)
+
     try:
+        if handoff:
+            tweaks = {TEXT_NODE_ID: {"input_value": text_data}}
+            if document_text is not None:
+                tweaks[DOCUMENT_TEXT_NODE_ID] = {"input_value": document_text}
+            else:
+                tweaks[FILE_NODE_ID] = {"path": [store_shared_upload(file_path)]}
+            payload = {
+                "input_value": text_data,
+                "output_type": "text",
+                "tweaks": tweaks
+            }
+
+            return post_run(endpoint, on_event, json=payload)
+
+        if document_text is not None:
+            files = {
+                TEXT_INPUT_FIELD_NAME: (None, text_data),
+                DOCUMENT_TEXT_FIELD_NAME: (None, document_text)
+            }
+
+            return post_run(endpoint, on_event, files=files)
+
         with open(file_path, 'rb') as f:
             files = {
                 FILE_INPUT_FIELD_NAME: (os.path.basename(file_path), f, 'application/pdf'),
                 TEXT_INPUT_FIELD_NAME: (None, text_data)
             }
 
-            print("Sending request to Langflow...")
-            response = requests.post(endpoint, files=files)
-            response.raise_for_status()
-
-            return response.json()
+            return post_run(endpoint, on_event, files=files)
 
     except requests.exceptions.RequestException as e:
         print(f"An error occurred while communicating with Langflow: {e}")
+        report_error(on_event, f"An error occurred while communicating with Langflow: {e}")
         return None
     except Exception as e:
         print(f"An unexpected error occurred: {e}")
+        report_error(on_event, f"An unexpected error occurred: {e}")
         return None
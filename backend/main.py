@@ -1,9 +1,13 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException
-from fastapi.encoders import jsonable_encoder
+from fastapi import FastAPI, File, Form, Query, UploadFile, HTTPException, BackgroundTasks, Request
+from fastapi.concurrency import run_in_threadpool
 import os
-from project import Project
+from typing import Optional
+from project import Project, Iteration
 from pydantic import BaseModel
 from langflow_client import trigger_langflow_with_file
+from run_events import RunEventFeed
+from admission import AdmissionController, QueueFull, Ticket, MAX_PRIORITY
+from payload import encode_response
 import shutil
 from starlette.responses import FileResponse
 from fastapi.middleware.cors import CORSMiddleware
@@ -16,35 +20,120 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Queue-Position", "X-Estimated-Wait", "X-Total-Iterations", "Retry-After"],
 )
 
 project = Project()
+# Iterations returned by /status when no page is asked for; stays below
+# project.ARCHIVE_CACHE_SIZE so polling the latest page is served from memory
+STATUS_PAGE_SIZE = int(os.getenv("STATUS_PAGE_SIZE", "20"))
+admission = AdmissionController()
+
+# Addresses of reverse proxies whose X-Client-Id header is taken as the client.
+# From anyone else the header is ignored, since rotating it would reset the
+# caller's round-robin turn.
+TRUSTED_PROXIES = {host.strip() for host in os.getenv("TRUSTED_PROXIES", "").split(",") if host.strip()}
+
+def client_id(request: Request) -> str:
+    host = request.client.host if request.client else "unknown"
+    if host in TRUSTED_PROXIES and request.headers.get("X-Client-Id"):
+        return request.headers["X-Client-Id"]
+    return host
+
+def run_flow(file_path: str):
+    """
+    Streams a flow run and turns its events into statuses while it runs.
+    """
+    feed = RunEventFeed(project)
+    try:
+        trigger_langflow_with_file(file_path, project.code_dir, on_event=feed.handle)
+        feed.flush()
+    except Exception as e:
+        feed.flush()
+        project.add_status(stage="Error", message=f"The flow run failed: {e}")
+
+async def run_admitted(ticket: Ticket, upload_path: str):
+    """
+    Waits for a free run slot, then runs the flow on the uploaded PDF. The
+    prompt is added only now, so the statuses of the previous run do not end
+    up under it.
+    """
+    try:
+        await admission.wait(ticket)
+        project.add_prompt("Initial PDF submission")
+        file_path = os.path.join(project.project_dir, "concept.pdf")
+        os.replace(upload_path, file_path)
+        await run_in_threadpool(run_flow, file_path)
+    finally:
+        admission.release(ticket)
 
 @app.post("/start")
-async def start_processing(file: UploadFile = File(...)):
-    file_path = os.path.join(project.project_dir, "concept.pdf")
-    
-    with open(file_path, "wb") as buffer:
-        buffer.write(await file.read())
-        
-    project.add_prompt("Initial PDF submission")
-    
-    # Trigger Langflow
-    trigger_langflow_with_file(file_path, project.code_dir)
-
-    return {"message": "Processing started"}
+async def start_processing(request: Request, background_tasks: BackgroundTasks,
+                           file: UploadFile = File(...), priority: int = Form(0, ge=0, le=MAX_PRIORITY)):
+    try:
+        ticket = admission.submit(client_id(request), priority)
+    except QueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+    # Kept apart from concept.pdf until the run is admitted, so it does not replace the running one's
+    # (with one run at a time, the previous run is done with concept.pdf by then)
+    upload_path = os.path.join(project.project_dir, f"upload-{ticket.seq}.pdf")
+    try:
+        with open(upload_path, "wb") as buffer:
+            buffer.write(await file.read())
+    except Exception:
+        admission.release(ticket)
+        raise
+
+    # Trigger Langflow after the response, so /status is served while the flow runs
+    background_tasks.add_task(run_admitted, ticket, upload_path)
+
+    if ticket.admitted.is_set():
+        return {"message": "Processing started"}
+    return {
+        "message": "Processing queued",
+        "queue_position": admission.position(ticket),
+        "estimated_wait": admission.estimated_wait(ticket)
+    }
 
 @app.get("/status")
-async def get_status():
+async def get_status(request: Request, offset: Optional[int] = Query(None, ge=0),
+                     limit: Optional[int] = Query(None, ge=1)):
+    """
+    One page of the project history: `limit` (default STATUS_PAGE_SIZE)
+    iterations from `offset`, each with the prompts before it. Without
+    `offset` it is the latest iterations and any prompt still waiting for its
+    run. Archived iterations outside the page are not read.
+    """
+    queue = admission.client_status(client_id(request))
+    items = list(project.history)
+    iteration_count = sum(1 for item in items if isinstance(item, Iteration))
+    headers = {
+        "X-Queue-Position": str(queue["queue_position"]),
+        "X-Estimated-Wait": str(queue["estimated_wait"]),
+        "X-Total-Iterations": str(iteration_count)
+    }
+
+    limit = limit or STATUS_PAGE_SIZE
+    if offset is None:
+        start, end = max(0, iteration_count - limit), None
+    else:
+        start, end = offset, offset + limit
+
     history = []
-    for item in project.history:
+    iteration_number = 0
+    for item in items:
+        in_page = iteration_number >= start and (end is None or iteration_number < end)
         if isinstance(item, str):
             if item == f"Sent to langflow with code_dir: {project.code_dir}":
                 continue
-            history.append(item)
+            if in_page:
+                history.append(item)
         else:
-            history.append(item.status_list)
-    return jsonable_encoder(history)
+            if in_page:
+                history.append(item.status_list)
+            iteration_number += 1
+    return encode_response(history, request.headers.get("Accept", ""), request.headers.get("Accept-Encoding", ""), headers)
 
 class UpdateStatusRequest(BaseModel):
     stage: str
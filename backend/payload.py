@@ -0,0 +1,63 @@
+import gzip
+import json
+from typing import Dict
+from fastapi import HTTPException
+from starlette.responses import Response
+
+# Optional encoders, used when installed and asked for by the client
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+# Smaller bodies are not worth compressing
+MIN_COMPRESS_SIZE = 1024
+
+def accepted_values(header: str) -> set:
+    """
+    Values listed in an Accept or Accept-Encoding header, without the ones
+    refused with `q=0`.
+    """
+    values = set()
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0"):
+            continue
+        if name.strip():
+            values.add(name.strip().lower())
+    return values
+
+def encode_response(data, accept: str = "", accept_encoding: str = "", headers: Dict[str, str] = None) -> Response:
+    """
+    Encodes a JSON-compatible payload as MessagePack when the client accepts it
+    and it is installed (JSON otherwise) and compresses it with brotli or gzip.
+    """
+    headers = dict(headers or {})
+    headers["Vary"] = "Accept, Accept-Encoding"
+
+    media_types = accepted_values(accept)
+    if MSGPACK_MEDIA_TYPE in media_types and msgpack is not None:
+        body = msgpack.packb(data)
+        media_type = MSGPACK_MEDIA_TYPE
+    elif media_types == {MSGPACK_MEDIA_TYPE}:
+        raise HTTPException(status_code=406, detail="MessagePack encoding is not available")
+    else:
+        body = json.dumps(data, separators=(",", ":")).encode("utf-8")
+        media_type = "application/json"
+
+    if len(body) >= MIN_COMPRESS_SIZE:
+        encodings = accepted_values(accept_encoding)
+        if "br" in encodings and brotli is not None:
+            body = brotli.compress(body)
+            headers["Content-Encoding"] = "br"
+        elif "gzip" in encodings:
+            body = gzip.compress(body, compresslevel=6)
+            headers["Content-Encoding"] = "gzip"
+
+    return Response(content=body, media_type=media_type, headers=headers)
@@ -0,0 +1,201 @@
+import os
+import hashlib
+import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterator, List, Tuple
+from pypdf import PdfReader, PageObject
+from pypdf.generic import ArrayObject, DictionaryObject, IndirectObject, StreamObject
+
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR", "../data/pdf_cache")
+# Least recently used page texts are removed once the cache is larger than this
+PDF_CACHE_MAX_BYTES = int(os.getenv("PDF_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+# Documents with more pages than this are extracted in a process pool
+PARALLEL_PAGE_THRESHOLD = int(os.getenv("PDF_PARALLEL_PAGE_THRESHOLD", "32"))
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", "0")) or None
+PAGES_PER_TASK = 8
+# Page entries that the text of a page depends on
+PAGE_ENTRIES = ("/Contents", "/Resources", "/MediaBox", "/CropBox", "/Rotate")
+
+# Shared by all runs. Workers are spawned rather than forked, since runs are
+# started from threads of a running server.
+_pool = None
+_pool_lock = threading.Lock()
+
+def file_digest(file_path: str) -> str:
+    sha256 = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+def _object_digest(obj, digests: Dict) -> bytes:
+    """
+    Hash of a PDF object and everything it refers to. Referenced objects are
+    hashed once per document, so fonts shared by many pages are not re-read.
+    Image data is left out, it does not change the text.
+    """
+    if isinstance(obj, IndirectObject):
+        ref = (obj.idnum, obj.generation)
+        if ref not in digests:
+            # Stands in for the object while it is hashed, in case it refers back to itself
+            digests[ref] = b"cycle"
+            digests[ref] = _object_digest(obj.get_object(), digests)
+        return digests[ref]
+
+    sha256 = hashlib.sha256(type(obj).__name__.encode())
+    if isinstance(obj, DictionaryObject):
+        for name in sorted(obj):
+            sha256.update(name.encode())
+            sha256.update(_object_digest(obj.raw_get(name), digests))
+        if isinstance(obj, StreamObject) and obj.get("/Subtype") != "/Image":
+            sha256.update(obj.get_data())
+    elif isinstance(obj, ArrayObject):
+        for item in obj:
+            sha256.update(_object_digest(item, digests))
+    else:
+        sha256.update(repr(obj).encode())
+    return sha256.digest()
+
+def page_key(page: PageObject, layout: bool, digests: Dict = None) -> str:
+    """
+    Cache key of a page: a hash of its content stream and its resources (fonts
+    and XObjects, with what they refer to). Unchanged pages of an edited
+    document keep their key.
+    """
+    digests = {} if digests is None else digests
+    sha256 = hashlib.sha256()
+    for name in PAGE_ENTRIES:
+        sha256.update(name.encode())
+        if name in page:
+            sha256.update(_object_digest(page.raw_get(name), digests))
+    mode = "layout" if layout else "plain"
+    return f"{sha256.hexdigest()}-{mode}"
+
+def _cache_path(key: str) -> str:
+    return os.path.join(PDF_CACHE_DIR, f"{key}.txt")
+
+def _read_cached(key: str):
+    try:
+        with open(_cache_path(key), 'r', encoding='utf-8') as f:
+            text = f.read()
+        # The modification time orders the entries for eviction
+        os.utime(_cache_path(key))
+        return text
+    except FileNotFoundError:
+        return None
+
+def _write_cached(key: str, text: str):
+    os.makedirs(PDF_CACHE_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=PDF_CACHE_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, _cache_path(key))
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def prune_cache(max_bytes: int = None):
+    """
+    Removes the least recently used page texts until the cache fits in `max_bytes`.
+    """
+    max_bytes = PDF_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    entries = []
+    with os.scandir(PDF_CACHE_DIR) as it:
+        for entry in it:
+            if entry.name.endswith(".txt"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+def _extract_page(reader: PdfReader, number: int, key: str, layout: bool) -> str:
+    text = _read_cached(key)
+    if text is None:
+        text = reader.pages[number].extract_text(extraction_mode="layout" if layout else "plain")
+        _write_cached(key, text)
+    return text
+
+def _extract_pages(file_path: str, numbers: List[int], layout: bool) -> List[str]:
+    """
+    Extracts a batch of pages. Runs in the worker processes, which open the
+    document themselves instead of receiving parsed pages, and leave the
+    cache to the caller.
+    """
+    reader = PdfReader(file_path)
+    return [reader.pages[number].extract_text(extraction_mode="layout" if layout else "plain") for number in numbers]
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+def iter_page_texts(file_path: str, layout: bool = False) -> Iterator[Tuple[int, str]]:
+    """
+    Yields (page_number, text) in page order. Cached pages are read in this
+    process; the others are parsed here one at a time, or in the process
+    pool for large documents, with at most one batch of page texts in flight
+    per worker.
+    """
+    reader = PdfReader(file_path)
+    digests = {}
+    keys = [page_key(page, layout, digests) for page in reader.pages]
+
+    missing = [number for number, key in enumerate(keys) if not os.path.exists(_cache_path(key))]
+    batches = []
+    if len(keys) > PARALLEL_PAGE_THRESHOLD:
+        batches = [missing[i:i + PAGES_PER_TASK] for i in range(0, len(missing), PAGES_PER_TASK)]
+
+    def submit(batch: List[int]):
+        return batch, _get_pool().submit(_extract_pages, file_path, batch, layout)
+
+    try:
+        window = PDF_WORKERS or os.cpu_count() or 1
+        pending = [submit(batch) for batch in batches[:window]]
+        next_batch = len(pending)
+        extracted = {}
+        for number, key in enumerate(keys):
+            if pending and pending[0][0][0] == number:
+                batch, future = pending.pop(0)
+                extracted = dict(zip(batch, future.result()))
+                for page in batch:
+                    _write_cached(keys[page], extracted[page])
+                if next_batch < len(batches):
+                    pending.append(submit(batches[next_batch]))
+                    next_batch += 1
+            text = extracted.pop(number, None)
+            if text is None:
+                # Small documents, and cached pages (also when evicted since the lookup above)
+                text = _extract_page(reader, number, key, layout)
+            yield number + 1, text
+    except BrokenProcessPool:
+        _reset_pool()
+        raise
+
+    if missing:
+        prune_cache()
+
+def extract_text(file_path: str, layout: bool = False) -> str:
+    """
+    Extracts the text of a PDF, one section per page.
+    """
+    return "\n\n".join(f"--- Page {number} ---\n{text}" for number, text in iter_page_texts(file_path, layout))
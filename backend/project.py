@@ -1,15 +1,57 @@
 import os
 import json
 import subprocess
-from typing import List, Dict, Union
+import threading
+from functools import lru_cache
+from typing import List, Dict, Sequence, Union
 
 DATA_DIR = "../data/project"
+ARCHIVE_CACHE_SIZE = 32
+
+@lru_cache(maxsize=ARCHIVE_CACHE_SIZE)
+def load_archive(path: str) -> Sequence[Dict]:
+    """
+    Statuses of an archived iteration. A tuple, since the cached value is
+    shared and archived iterations do not change.
+    """
+    with open(path, 'r') as f:
+        return tuple(json.load(f))
 
 class Iteration:
-    def __init__(self, commit_id: str = None, project_dir: str = None):
-        self.status_list: List[Dict] = []
+    """
+    An agent run and its statuses. Once an iteration is no longer the latest
+    history item it does not change anymore, and its statuses are moved to an
+    archive file that is read again only when they are asked for.
+    """
+    __slots__ = ("_status_list", "commit_id", "project_dir", "archive", "status_count")
+
+    def __init__(self, commit_id: str = None, project_dir: str = None, archive: str = None, status_count: int = 0):
+        self._status_list: List[Dict] = [] if archive is None else None
         self.commit_id = commit_id
         self.project_dir = project_dir
+        self.archive = archive
+        self.status_count = status_count
+
+    @property
+    def status_list(self) -> Sequence[Dict]:
+        if self._status_list is None:
+            return load_archive(os.path.join(self.project_dir, self.archive))
+        return self._status_list
+
+    @status_list.setter
+    def status_list(self, status_list: List[Dict]):
+        self._status_list = status_list
+        self.archive = None
+
+    def archive_statuses(self, index: int):
+        self.archive = os.path.join("archive", f"iteration-{index}.json")
+        path = os.path.join(self.project_dir, self.archive)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(self._status_list, f, separators=(",", ":"))
+        load_archive.cache_clear()
+        self.status_count = len(self._status_list)
+        self._status_list = None
 
     def commit(self):
         if not self.commit_id:
@@ -20,6 +62,12 @@ class Iteration:
             self.commit_id = result.stdout.strip()
 
     def to_dict(self):
+        if self.archive is not None:
+            return {
+                "archive": self.archive,
+                "status_count": self.status_count,
+                "commit_id": self.commit_id
+            }
         return {
             "status_list": self.status_list,
             "commit_id": self.commit_id
@@ -30,6 +78,8 @@ class Project:
         self.project_dir = DATA_DIR
         self.code_dir = os.path.join(self.project_dir, "code")
         self.history_file = os.path.join(self.project_dir, "history.json")
+        # Statuses also come from flow runs in background threads
+        self._lock = threading.RLock()
         self._load_history()
         os.makedirs(self.project_dir, exist_ok=True)
         os.makedirs(self.code_dir, exist_ok=True)
@@ -42,7 +92,10 @@ class Project:
                 history_data = json.load(f)
                 self.history = []
                 for item in history_data:
-                    if isinstance(item, dict) and 'status_list' in item:
+                    if isinstance(item, dict) and 'archive' in item:
+                        self.history.append(Iteration(commit_id=item.get('commit_id'), project_dir=self.project_dir,
+                                                      archive=item['archive'], status_count=item['status_count']))
+                    elif isinstance(item, dict) and 'status_list' in item:
                         iteration = Iteration(commit_id=item.get('commit_id'), project_dir=self.project_dir)
                         iteration.status_list = item['status_list']
                         self.history.append(iteration)
@@ -52,38 +105,46 @@ class Project:
             self.history = []
 
     def save_history(self):
-        with open(self.history_file, 'w') as f:
+        with self._lock:
+            for index, item in enumerate(self.history[:-1]):
+                if isinstance(item, Iteration) and item.archive is None:
+                    item.archive_statuses(index)
+
             history_data = []
             for item in self.history:
                 if isinstance(item, Iteration):
                     history_data.append(item.to_dict())
                 else:
                     history_data.append(item)
-            json.dump(history_data, f, indent=4)
+            with open(self.history_file, 'w') as f:
+                json.dump(history_data, f, indent=4)
 
     def add_prompt(self, prompt: str):
-        self.history.append(prompt)
-        self.save_history()
+        with self._lock:
+            self.history.append(prompt)
+            self.save_history()
 
     def add_status(self, stage: str, message: str, zip_result: str = None, preview: str = None):
-        if not self.history or not isinstance(self.history[-1], Iteration):
-            self.history.append(Iteration(project_dir=self.project_dir))
-        
-        iteration = self.history[-1]
-        status_index = len(iteration.status_list)
-        status = {
-            "stage": stage,
-            "message": message,
-            "zip_result": zip_result,
-            "preview": preview,
-            "index": status_index
-        }
-        iteration.status_list.append(status)
-        self.save_history()
+        with self._lock:
+            if not self.history or not isinstance(self.history[-1], Iteration):
+                self.history.append(Iteration(project_dir=self.project_dir))
+
+            iteration = self.history[-1]
+            status_index = len(iteration.status_list)
+            status = {
+                "stage": stage,
+                "message": message,
+                "zip_result": zip_result,
+                "preview": preview,
+                "index": status_index
+            }
+            iteration.status_list.append(status)
+            self.save_history()
 
     def rollback(self):
-        if self.history and isinstance(self.history[-1], Iteration):
-            iteration = self.history.pop()
-            if iteration.commit_id:
-                subprocess.run(["git", "reset", "--hard", "HEAD~1"], cwd=self.code_dir)
-            self.save_history()
\ No newline at end of file
+        with self._lock:
+            if self.history and isinstance(self.history[-1], Iteration):
+                iteration = self.history.pop()
+                if iteration.commit_id:
+                    subprocess.run(["git", "reset", "--hard", "HEAD~1"], cwd=self.code_dir)
+                self.save_history()
\ No newline at end of file
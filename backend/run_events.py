@@ -0,0 +1,85 @@
+import os
+import time
+import threading
+from typing import Dict
+
+STATUS_COALESCE_SECONDS = float(os.getenv("STATUS_COALESCE_SECONDS", "0.5"))
+
+class RunEventFeed:
+    """
+    Turns the events of a streamed Langflow run into project statuses.
+
+    Token chunks are collected and added as one "Agent" status per batch,
+    at most every `interval` seconds and at the latest `interval` seconds
+    after the first chunk of a batch, also when the stream goes quiet. Added
+    statuses are not changed afterwards, so a client that polls /status
+    during the run sees each of them once. Tool starts, tool results and
+    errors are added right away.
+    """
+
+    def __init__(self, project, interval: float = STATUS_COALESCE_SECONDS):
+        self.project = project
+        self.interval = interval
+        self.message_id = None
+        self.pending = ""
+        self.last_flush = 0.0
+        self.tool_states: Dict[str, str] = {}
+        self._timer = None
+        # The deadline flush runs in the timer's thread
+        self._lock = threading.RLock()
+
+    def handle(self, event: Dict):
+        kind = event.get("event")
+        data = event.get("data") or {}
+        with self._lock:
+            if kind == "token":
+                self._on_token(data)
+            elif kind == "add_message":
+                self._on_message(data)
+            elif kind == "error":
+                self.flush()
+                error = data.get("error") or data.get("text") or str(data)
+                self.project.add_status(stage="Error", message=error)
+            elif kind == "end":
+                self.flush()
+
+    def _on_token(self, data: Dict):
+        if data.get("id") != self.message_id:
+            self.flush()
+            self.message_id = data.get("id")
+        self.pending += data.get("chunk", "")
+        if time.monotonic() - self.last_flush >= self.interval:
+            self.flush()
+        elif self._timer is None:
+            self._timer = threading.Timer(self.interval, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _on_message(self, data: Dict):
+        for block in data.get("content_blocks") or []:
+            for i, content in enumerate(block.get("contents") or []):
+                if content.get("type") != "tool_use":
+                    continue
+                key = f"{data.get('id')}:{block.get('title')}:{i}"
+                if content.get("error"):
+                    state = "failed"
+                elif content.get("output") is not None:
+                    state = "finished"
+                else:
+                    state = "started"
+                if self.tool_states.get(key) == state:
+                    continue
+                self.tool_states[key] = state
+                self.flush()
+                self.project.add_status(stage="Tool", message=f"{content.get('name')} {state}")
+
+    def flush(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self.pending:
+                return
+            self.project.add_status(stage="Agent", message=self.pending)
+            self.pending = ""
+            self.last_flush = time.monotonic()
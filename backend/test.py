@@ -2,8 +2,18 @@ import os
 import shutil
 from fastapi.testclient import TestClient
 from unittest.mock import patch
-from main import app, project
+from main import app, project, run_flow
+import project as project_module
 import zipfile
+import langflow_client
+from concurrent.futures import ThreadPoolExecutor
+import pdf_text
+from run_events import RunEventFeed
+from admission import AdmissionController, QueueFull
+import pytest
+import json
+import time
+import msgpack
 
 client = TestClient(app)
 
@@ -174,4 +184,386 @@ def test_undo(mock_trigger_langflow):
     assert response.status_code == 200
     json_response = response.json()
     assert len(json_response) == 1
-    assert json_response[0] == "Initial PDF submission"
\ No newline at end of file
+    assert json_response[0] == "Initial PDF submission"
+
+def test_shared_upload_is_content_addressed(tmp_path):
+    pdf_path = tmp_path / "concept.pdf"
+    pdf_path.write_bytes(b"This is a test pdf.")
+    shared_dir = tmp_path / "uploads"
+
+    with patch('langflow_client.SHARED_UPLOADS_DIR', str(shared_dir)):
+        first = langflow_client.store_shared_upload(str(pdf_path))
+        second = langflow_client.store_shared_upload(str(pdf_path))
+
+    assert first == second
+    assert first.startswith("/app/data/uploads/")
+    assert os.listdir(shared_dir) == [os.path.basename(first)]
+
+def test_shared_upload_from_concurrent_runs(tmp_path):
+    pdf_path = tmp_path / "concept.pdf"
+    pdf_path.write_bytes(b"This is a test pdf.")
+    shared_dir = tmp_path / "uploads"
+
+    with patch('langflow_client.SHARED_UPLOADS_DIR', str(shared_dir)), ThreadPoolExecutor(max_workers=4) as pool:
+        paths = list(pool.map(lambda _: langflow_client.store_shared_upload(str(pdf_path)), range(8)))
+
+    assert len(set(paths)) == 1
+    assert os.listdir(shared_dir) == [os.path.basename(paths[0])]
+
+@patch('langflow_client.requests.post')
+def test_trigger_langflow_with_tweaks(mock_post, tmp_path):
+    pdf_path = tmp_path / "concept.pdf"
+    pdf_path.write_bytes(b"This is a test pdf.")
+
+    with patch('langflow_client.SHARED_UPLOADS_DIR', str(tmp_path / "uploads")), \
+            patch('langflow_client.FILE_NODE_ID', "File-setGR"), \
+            patch('langflow_client.TEXT_NODE_ID', "TextInput-mnXNV"):
+        langflow_client.trigger_langflow_with_file(str(pdf_path), "../data/project/code")
+
+    payload = mock_post.call_args.kwargs["json"]
+    assert "files" not in mock_post.call_args.kwargs
+    assert payload["tweaks"]["File-setGR"]["path"][0].startswith("/app/data/uploads/")
+    assert payload["tweaks"]["TextInput-mnXNV"] == {"input_value": "../data/project/code"}
+
+REQUIREMENTS_PDF = "../uploads/requirements.pdf"
+
+def test_extract_text_uses_page_cache(tmp_path):
+    with patch('pdf_text.PDF_CACHE_DIR', str(tmp_path)):
+        text = pdf_text.extract_text(REQUIREMENTS_PDF)
+        assert "--- Page 1 ---" in text
+        assert "Web Calculator with Currency Conversion" in text
+        assert len(os.listdir(tmp_path)) == 2
+
+        with patch('pypdf.PageObject.extract_text') as mock_extract:
+            assert pdf_text.extract_text(REQUIREMENTS_PDF) == text
+            mock_extract.assert_not_called()
+
+def write_xobject_pdf(path, texts):
+    """
+    Writes a PDF whose pages only draw a form XObject (`q /X0 Do Q`), so all
+    pages share the same content stream and differ only in their resources.
+    """
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_refs = []
+    for text in texts:
+        form = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET"
+        objects.append(f"<< /Type /XObject /Subtype /Form /BBox [0 0 612 792] /Resources << /Font << /F1 3 0 R >> >> /Length {len(form)} >>\nstream\n{form}\nendstream")
+        form_ref = len(objects)
+        content = "q /X0 Do Q"
+        objects.append(f"<< /Length {len(content)} >>\nstream\n{content}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {len(objects)} 0 R /Resources << /XObject << /X0 {form_ref} 0 R >> >> >>")
+        page_refs.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(page_refs)}] /Count {len(texts)} >>"
+
+    data = b"%PDF-1.4\n"
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(data))
+        data += f"{number} 0 obj\n{obj}\nendobj\n".encode("latin-1")
+    xref = len(data)
+    data += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    data += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode("latin-1")
+    data += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    path.write_bytes(data)
+
+def test_extract_text_of_pages_with_identical_content_streams(tmp_path):
+    first = tmp_path / "first.pdf"
+    second = tmp_path / "second.pdf"
+    write_xobject_pdf(first, ["Alpha requirements", "Beta requirements"])
+    write_xobject_pdf(second, ["Gamma requirements", "Delta requirements"])
+
+    with patch('pdf_text.PDF_CACHE_DIR', str(tmp_path / "cache")):
+        assert [text for _, text in pdf_text.iter_page_texts(str(first))] == ["Alpha requirements", "Beta requirements"]
+        assert [text for _, text in pdf_text.iter_page_texts(str(second))] == ["Gamma requirements", "Delta requirements"]
+
+def test_extract_text_in_process_pool(tmp_path):
+    with patch('pdf_text.PDF_CACHE_DIR', str(tmp_path)):
+        text = pdf_text.extract_text(REQUIREMENTS_PDF)
+
+    with patch('pdf_text.PDF_CACHE_DIR', str(tmp_path / "parallel")), \
+            patch('pdf_text.PARALLEL_PAGE_THRESHOLD', 0), \
+            patch('pdf_text.PAGES_PER_TASK', 1):
+        assert pdf_text.extract_text(REQUIREMENTS_PDF) == text
+
+        # Cached pages are read in this process, without starting the pool
+        with patch('pdf_text._get_pool') as mock_pool:
+            assert pdf_text.extract_text(REQUIREMENTS_PDF) == text
+            mock_pool.assert_not_called()
+
+def test_extract_text_reuses_unchanged_pages(tmp_path):
+    first = tmp_path / "first.pdf"
+    edited = tmp_path / "edited.pdf"
+    write_xobject_pdf(first, ["Alpha requirements", "Beta requirements"])
+    write_xobject_pdf(edited, ["Alpha requirements", "Gamma requirements"])
+
+    with patch('pdf_text.PDF_CACHE_DIR', str(tmp_path / "cache")):
+        pdf_text.extract_text(str(first))
+        with patch('pypdf.PageObject.extract_text', return_value="Gamma requirements") as mock_extract:
+            assert [text for _, text in pdf_text.iter_page_texts(str(edited))] == ["Alpha requirements", "Gamma requirements"]
+        assert mock_extract.call_count == 1
+
+def test_page_cache_is_bounded(tmp_path):
+    with patch('pdf_text.PDF_CACHE_DIR', str(tmp_path)), patch('pdf_text.PDF_CACHE_MAX_BYTES', 1):
+        text = pdf_text.extract_text(REQUIREMENTS_PDF)
+        assert os.listdir(tmp_path) == []
+
+        # Evicted pages are extracted again
+        assert pdf_text.extract_text(REQUIREMENTS_PDF) == text
+
+@patch('langflow_client.requests.post')
+def test_trigger_langflow_with_document_text(mock_post, tmp_path):
+    with patch('pdf_text.PDF_CACHE_DIR', str(tmp_path)), \
+            patch('langflow_client.DOCUMENT_TEXT_FIELD_NAME', "TextInput-document"), \
+            patch('langflow_client.TEXT_INPUT_FIELD_NAME', "TextInput-mnXNV"):
+        langflow_client.trigger_langflow_with_file(REQUIREMENTS_PDF, "../data/project/code")
+
+    files = mock_post.call_args.kwargs["files"]
+    assert "Web Calculator" in files["TextInput-document"][1]
+    assert files["TextInput-mnXNV"] == (None, "../data/project/code")
+    assert len(files) == 2
+
+def test_run_event_feed_coalesces_tokens():
+    feed = RunEventFeed(project, interval=60)
+    for chunk in ["Planning ", "the ", "app"]:
+        feed.handle({"event": "token", "data": {"id": "msg-1", "chunk": chunk}})
+    tool_use = {"type": "tool_use", "name": "write_file", "output": None}
+    feed.handle({"event": "add_message", "data": {"id": "msg-1", "content_blocks": [{"title": "Agent Steps", "contents": [tool_use]}]}})
+    feed.handle({"event": "add_message", "data": {"id": "msg-1", "content_blocks": [{"title": "Agent Steps", "contents": [tool_use]}]}})
+    tool_use["output"] = "Successfully wrote 10 characters to app.py"
+    feed.handle({"event": "add_message", "data": {"id": "msg-1", "content_blocks": [{"title": "Agent Steps", "contents": [tool_use]}]}})
+    feed.handle({"event": "token", "data": {"id": "msg-1", "chunk": " done"}})
+    feed.handle({"event": "end", "data": {"result": {}}})
+
+    status_list = project.history[-1].status_list
+    assert [(status["stage"], status["message"]) for status in status_list] == [
+        ("Agent", "Planning "),
+        ("Agent", "the app"),
+        ("Tool", "write_file started"),
+        ("Tool", "write_file finished"),
+        ("Agent", " done"),
+    ]
+
+def test_status_polls_during_a_stream_see_each_status_once():
+    feed = RunEventFeed(project, interval=0)
+    seen = {}
+    for chunk in ["Plan", "ning ", "the ", "app"]:
+        feed.handle({"event": "token", "data": {"id": "msg-1", "chunk": chunk}})
+        for status in client.get("/status").json()[-1]:
+            # The frontend tells statuses apart by index and message
+            assert seen.setdefault(status["index"], status["message"]) == status["message"]
+    feed.handle({"event": "end", "data": {"result": {}}})
+
+    assert "".join(status["message"] for status in project.history[-1].status_list) == "Planning the app"
+
+def test_run_event_feed_flushes_when_the_stream_goes_quiet():
+    feed = RunEventFeed(project, interval=0.05)
+    feed.handle({"event": "token", "data": {"id": "msg-1", "chunk": "Planning "}})
+    feed.handle({"event": "token", "data": {"id": "msg-1", "chunk": "the app"}})
+    assert [status["message"] for status in project.history[-1].status_list] == ["Planning "]
+
+    time.sleep(0.2)
+    assert [status["message"] for status in project.history[-1].status_list] == ["Planning ", "the app"]
+
+@patch('langflow_client.requests.post')
+def test_trigger_langflow_streams_events(mock_post, tmp_path):
+    pdf_path = tmp_path / "concept.pdf"
+    pdf_path.write_bytes(b"This is a test pdf.")
+    response = mock_post.return_value.__enter__.return_value
+    response.iter_lines.return_value = [
+        b'{"event": "token", "data": {"id": "msg-1", "chunk": "Hello"}}',
+        b'',
+        b'{"event": "end", "data": {"result": {"outputs": []}}}',
+    ]
+    events = []
+
+    result = langflow_client.trigger_langflow_with_file(str(pdf_path), "../data/project/code", on_event=events.append)
+
+    assert mock_post.call_args.kwargs["params"] == {"stream": "true"}
+    assert [event["event"] for event in events] == ["token", "end"]
+    assert result == {"outputs": []}
+
+def test_admission_orders_by_priority_and_client():
+    admission = AdmissionController(max_in_flight=1, max_queued=4, estimate=10)
+    running = admission.submit("a")
+    a2 = admission.submit("a")
+    a3 = admission.submit("a")
+    b1 = admission.submit("b")
+    urgent = admission.submit("c", priority=1)
+
+    assert running.admitted.is_set()
+    assert [admission.position(ticket) for ticket in (urgent, b1, a2, a3)] == [1, 2, 3, 4]
+    assert admission.estimated_wait(b1) == 20
+    assert admission.client_status("a") == {"queue_position": 3, "estimated_wait": 30}
+
+    with pytest.raises(QueueFull) as e:
+        admission.submit("d")
+    assert e.value.retry_after == 10
+
+    admission.release(running)
+    assert urgent.admitted.is_set()
+    assert admission.position(b1) == 1
+
+def test_admission_caps_queued_runs_per_client():
+    admission = AdmissionController(max_in_flight=1, max_queued=16, estimate=10, max_queued_per_client=4)
+    for _ in range(5):
+        admission.submit("a")
+
+    with pytest.raises(QueueFull):
+        admission.submit("a")
+    assert not admission.submit("b").admitted.is_set()
+
+def test_admission_round_robin_with_late_clients():
+    admission = AdmissionController(max_in_flight=1, max_queued=16, estimate=10, max_queued_per_client=16)
+    tickets = [admission.submit("a") for _ in range(10)]
+    for ticket in tickets[:5]:
+        admission.release(ticket)
+    tickets += [admission.submit("b") for _ in range(6)]
+
+    order = []
+    while admission.running:
+        ticket = admission.running[0]
+        order.append(ticket.client)
+        admission.release(ticket)
+    assert "".join(order) == "abababababb"
+
+def test_client_id_header_only_from_trusted_proxies():
+    with patch('main.admission.client_status', return_value={"queue_position": 0, "estimated_wait": 0}) as mock_status:
+        client.get("/status", headers={"X-Client-Id": "rotated"})
+        assert mock_status.call_args.args == ("testclient",)
+
+        with patch('main.TRUSTED_PROXIES', {"testclient"}):
+            client.get("/status", headers={"X-Client-Id": "behind-proxy"})
+        assert mock_status.call_args.args == ("behind-proxy",)
+
+@patch('main.trigger_langflow_with_file')
+def test_start_rejected_when_queue_full(mock_trigger_langflow):
+    full = AdmissionController(max_in_flight=1, max_queued=0, estimate=30)
+    full.submit("someone else")
+
+    with patch('main.admission', full):
+        with open("test.pdf", "wb") as f:
+            f.write(b"This is a test pdf.")
+        with open("test.pdf", "rb") as f:
+            response = client.post("/start", files={"file": ("test.pdf", f, "application/pdf")})
+        os.remove("test.pdf")
+
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "30"
+        mock_trigger_langflow.assert_not_called()
+        assert "Initial PDF submission" not in project.history
+
+        response = client.get("/status")
+        assert response.headers["X-Queue-Position"] == "0"
+        assert response.headers["X-Estimated-Wait"] == "0"
+
+def test_completed_iterations_are_archived():
+    for i in range(3):
+        project.add_prompt(f"Prompt {i}")
+        project.add_status(stage="Implementation", message=f"Iteration {i}")
+
+    with open(project.history_file, 'r') as f:
+        history_data = json.load(f)
+    assert history_data[1] == {"archive": "archive/iteration-1.json", "status_count": 1, "commit_id": None}
+    assert "status_list" in history_data[-1]
+
+    project.__init__()
+    assert project.history[1]._status_list is None
+    assert project.history[1].status_list[0]["message"] == "Iteration 0"
+    assert project.history[1]._status_list is None
+
+@patch('main.trigger_langflow_with_file')
+def test_get_status_paginated(mock_trigger_langflow):
+    for i in range(3):
+        project.add_prompt(f"Prompt {i}")
+        project.add_status(stage="Implementation", message=f"Iteration {i}")
+
+    response = client.get("/status", params={"offset": 1, "limit": 1})
+    assert response.status_code == 200
+    assert response.headers["X-Total-Iterations"] == "3"
+    json_response = response.json()
+    assert json_response[0] == "Prompt 1"
+    assert json_response[1][0]["message"] == "Iteration 1"
+    assert len(json_response) == 2
+
+def test_get_status_encodings():
+    for i in range(20):
+        project.add_status(stage="Implementation", message=f"Wrote module_{i}.py")
+
+    response = client.get("/status", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert len(response.json()[0]) == 20
+
+    response = client.get("/status", headers={"Accept": "application/msgpack"})
+    assert response.headers["content-type"] == "application/msgpack"
+    assert msgpack.unpackb(response.content) == client.get("/status").json()
+
+    response = client.get("/status", headers={"Accept-Encoding": "gzip, br"})
+    assert response.headers["Content-Encoding"] == "br"
+    assert response.json()[0][0]["message"] == "Wrote module_0.py"
+
+def test_get_status_media_type_negotiation():
+    response = client.get("/status", headers={"Accept": "application/msgpack;q=0, application/json"})
+    assert response.headers["content-type"] == "application/json"
+
+    with patch('payload.msgpack', None):
+        response = client.get("/status", headers={"Accept": "application/msgpack, application/json"})
+        assert response.headers["content-type"] == "application/json"
+
+        response = client.get("/status", headers={"Accept": "application/msgpack"})
+        assert response.status_code == 406
+
+@patch('langflow_client.requests.post')
+def test_trigger_langflow_stream_errors_reach_status_feed(mock_post, tmp_path):
+    pdf_path = tmp_path / "concept.pdf"
+    pdf_path.write_bytes(b"This is a test pdf.")
+    response = mock_post.return_value.__enter__.return_value
+    response.iter_lines.return_value = [
+        b'{"event": "token", "data": {"id": "msg-1", "chunk": "Hello"}}',
+        b'not json',
+    ]
+    feed = RunEventFeed(project, interval=60)
+
+    langflow_client.trigger_langflow_with_file(str(pdf_path), "../data/project/code", on_event=feed.handle)
+
+    status_list = project.history[-1].status_list
+    assert [status["stage"] for status in status_list] == ["Agent", "Error"]
+    assert status_list[0]["message"] == "Hello"
+    assert "stream ended" in status_list[1]["message"]
+
+@patch('main.trigger_langflow_with_file', side_effect=RuntimeError("boom"))
+def test_run_flow_reports_failures(mock_trigger_langflow):
+    run_flow(os.path.join(project.project_dir, "concept.pdf"))
+
+    status = project.history[-1].status_list[-1]
+    assert status["stage"] == "Error"
+    assert "boom" in status["message"]
+
+@patch('main.trigger_langflow_with_file')
+def test_start_rejects_out_of_range_priority(mock_trigger_langflow):
+    with open("test.pdf", "wb") as f:
+        f.write(b"This is a test pdf.")
+    with open("test.pdf", "rb") as f:
+        response = client.post("/start", files={"file": ("test.pdf", f, "application/pdf")}, data={"priority": str(10**9)})
+    os.remove("test.pdf")
+
+    assert response.status_code == 422
+    mock_trigger_langflow.assert_not_called()
+
+@patch('main.STATUS_PAGE_SIZE', 2)
+def test_get_status_defaults_to_latest_iterations():
+    for i in range(4):
+        project.add_prompt(f"Prompt {i}")
+        project.add_status(stage="Implementation", message=f"Iteration {i}")
+    project.add_prompt("Prompt 4")
+
+    response = client.get("/status")
+    assert response.headers["X-Total-Iterations"] == "4"
+    json_response = response.json()
+    assert json_response[0] == "Prompt 2"
+    assert json_response[3][0]["message"] == "Iteration 3"
+    assert json_response[-1] == "Prompt 4"
+
+    misses = project_module.load_archive.cache_info().misses
+    client.get("/status")
+    assert project_module.load_archive.cache_info().misses == misses
+    assert isinstance(project.history[5].status_list, tuple)